@@ -1,18 +1,252 @@
 import ee
+import functools
+import hashlib
+import io
+import math
+import numpy as np
+import os
+import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Tuple, Optional
 import json
-import os
+import atexit
+import logging
+import logging.handlers
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard json module
+    orjson = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional, images are kept in their downloaded format
+    Image = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# High-volume endpoint is tuned for many concurrent requests
+EE_HIGH_VOLUME_URL = 'https://earthengine-highvolume.googleapis.com'
+
+# Number of concurrent Earth Engine requests per call
+MAX_WORKERS = 16
+
+# Number of concurrent image downloads
+DOWNLOAD_WORKERS = 8
+
+# Size cap of each output_dir/.cache download cache; least recently used
+# entries are evicted beyond it
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Shared HTTP session so downloads reuse pooled keep-alive connections
+# instead of re-handshaking TLS per image; transient failures are retried
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=DOWNLOAD_WORKERS,
+    pool_maxsize=DOWNLOAD_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+))
+
+# Sentinel-2 visualization parameters (10m resolution)
+SENTINEL_VIS_PARAMS = {
+    'bands': ['B4', 'B3', 'B2'],
+    'min': 0.0,
+    'max': 3000,
+    'gamma': 1.4
+}
+
+# Landsat visualization parameters (30m resolution)
+LANDSAT_VIS_PARAMS = {
+    'bands': ['SR_B4', 'SR_B3', 'SR_B2'],
+    'min': 0.0,
+    'max': 0.3,
+    'gamma': 1.4
+}
+
+# Supported datasets: Earth Engine collection and cloud cover property,
+# extra thumbnail visualization parameters (commercial, NAIP and Planet
+# imagery is already visualized RGB), RGB bands for raw pixel downloads
+# (None downloads all bands) and how metadata fields map to image
+# properties. Datasets without a cloud property are sorted newest first.
+DATASETS = {
+    'worldview': {
+        'collection': 'WORLDVIEW/WV04/PANSHARPENED',
+        'cloud_property': 'cloud_cover',
+        'extra_vis': {},
+        'bands': None,
+        'prop_map': {'date': 'acquisition_date', 'cloud_cover': 'cloud_cover'},
+        'resolution': '0.3-0.5m',
+        'dataset': 'WorldView'
+    },
+    'geoeye': {
+        'collection': 'GEOEYE/GE01/PANSHARPENED',
+        'cloud_property': 'cloud_cover',
+        'extra_vis': {},
+        'bands': None,
+        'prop_map': {'date': 'acquisition_date', 'cloud_cover': 'cloud_cover'},
+        'resolution': '0.5m',
+        'dataset': 'GeoEye-1'
+    },
+    'skysat': {
+        'collection': 'SKYSAT/GEN-A/PUBLIC/ORTHO/RGB',
+        'cloud_property': 'CLOUD_COVER',
+        'extra_vis': {},
+        'bands': ['R', 'G', 'B'],
+        'prop_map': {'date': 'ACQUIRED', 'cloud_cover': 'CLOUD_COVER'},
+        'resolution': '0.5-1m',
+        'dataset': 'SkySat'
+    },
+    'naip': {
+        'collection': 'USDA/NAIP/DOQQ',
+        'cloud_property': None,
+        'date_range': ('2018-01-01', '2022-12-31'),  # NAIP has limited temporal coverage
+        'extra_vis': {},
+        'bands': ['R', 'G', 'B'],
+        'prop_map': {'date': 'system:time_start'},
+        'resolution': '1m',
+        'dataset': 'NAIP'
+    },
+    'planet': {
+        'collection': 'PLANET/PSScene/Visual',
+        'cloud_property': 'cloud_cover',
+        'cloud_scale': 0.01,  # cloud_cover is a 0-1 fraction
+        'extra_vis': {},
+        'bands': None,
+        'prop_map': {'date': 'acquired', 'cloud_cover': 'cloud_cover'},
+        'resolution': '3-5m',
+        'dataset': 'PlanetScope'
+    },
+    'sentinel': {
+        'collection': 'COPERNICUS/S2_SR_HARMONIZED',
+        'cloud_property': 'CLOUDY_PIXEL_PERCENTAGE',
+        'extra_vis': SENTINEL_VIS_PARAMS,
+        'bands': ['B4', 'B3', 'B2'],
+        # The acquisition date is embedded in the product ID
+        'prop_map': {'date': 'PRODUCT_ID', 'cloud_cover': 'CLOUDY_PIXEL_PERCENTAGE', 'product_id': 'PRODUCT_ID'},
+        'date_parser': lambda product_id: product_id.split('_')[2][:8],
+        'resolution': '10m'
+    },
+    'landsat': {
+        'collection': 'LANDSAT/LC08/C02/T1_L2',
+        'cloud_property': 'CLOUD_COVER',
+        'extra_vis': LANDSAT_VIS_PARAMS,
+        'bands': ['SR_B4', 'SR_B3', 'SR_B2'],
+        'prop_map': {'date': 'DATE_ACQUIRED', 'cloud_cover': 'CLOUD_COVER', 'scene_id': 'LANDSAT_SCENE_ID'},
+        'resolution': '30m'
+    }
+}
+
+# Datasets queried by each resolution mode, in reporting order
+MODE_DATASETS = {
+    'standard': ('landsat', 'sentinel'),
+    'high_res': ('naip', 'planet', 'sentinel', 'landsat'),
+    'ultra_high_res': ('worldview', 'geoeye', 'skysat', 'naip', 'sentinel')
+}
+
+# Maximum cloud cover percentage for each resolution mode
+CLOUD_THRESHOLDS = {
+    'standard': 20,
+    'high_res': 10,
+    'ultra_high_res': 5
+}
+
+# Characters replaced or dropped when turning a location name into a path component
+_SLUG_TABLE = str.maketrans({' ': '_', ',': '', '/': '_', "'": ''})
+
+def slugify(name: str) -> str:
+    """
+    Turn a location name into a lowercase directory name.
+    
+    Args:
+        name: Location name, e.g. "New York City, USA"
+    
+    Returns:
+        Slug such as "new_york_city_usa"
+    """
+    return name.lower().translate(_SLUG_TABLE)
+
+def parse_resolution_meters(resolution: str) -> float:
+    """
+    Parse a resolution label such as "30m" or "0.3-1m" into meters.
+    
+    Args:
+        resolution: Resolution label; ranges resolve to their finest end
+    
+    Returns:
+        Resolution in meters, or infinity if the label is not numeric
+    """
+    try:
+        return float(resolution.split('-')[0].rstrip('m'))
+    except (AttributeError, ValueError):
+        return math.inf
+
+def format_table(columns: List[str], rows: List[Tuple], indent: str = "") -> str:
+    """
+    Render rows as a fixed-column text table.
+    
+    Args:
+        columns: Column headers
+        rows: Row tuples, in column order
+        indent: Prefix for every line of the table
+    
+    Returns:
+        Table text, one line per row plus a header and rule
+    """
+    cells = [tuple(map(str, columns))] + [tuple(map(str, row)) for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "".join(f"{indent}{line}\n" for line in lines)
+
+# Started by configure_logging
+_log_listener = None
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """
+    Route log records to stderr through a background thread (once per process).
+    
+    Meant for scripts; library users configure logging themselves. Worker
+    threads only enqueue records and a single listener thread writes them,
+    so logging never blocks the thread pools on terminal I/O.
+    
+    Args:
+        level: Minimum level of the root logger (default: INFO)
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue = queue.Queue(-1)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    _log_listener = logging.handlers.QueueListener(log_queue, handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+# Set once Earth Engine has been initialized in this process
+_initialized = False
 
 def initialize_earth_engine():
-    """Initialize Google Earth Engine with authentication."""
+    """Initialize Google Earth Engine with authentication (once per process)."""
+    global _initialized
+    if _initialized:
+        return
     try:
-        ee.Initialize()
-        print("Earth Engine initialized successfully")
+        ee.Initialize(opt_url=EE_HIGH_VOLUME_URL)
+        _initialized = True
+        logger.info("Earth Engine initialized successfully")
     except Exception as e:
-        print(f"Earth Engine initialization failed: {e}")
-        print("Please run 'earthengine authenticate' first")
+        logger.error(f"Earth Engine initialization failed: {e}")
+        logger.error("Please run 'earthengine authenticate' first")
         raise
 
 def get_san_francisco_tiles_and_images(
@@ -24,7 +258,10 @@ def get_san_francisco_tiles_and_images(
     end_date: str = "2023-12-31",
     resolution_mode: str = "standard",
     save_json: bool = True,
-    output_dir: str = "output"
+    output_dir: str = "output",
+    output_format: str = "png",
+    datasets: Optional[List[str]] = None,
+    pretty: bool = False
 ) -> Dict:
     """
     Get tiles information and images for a point in San Francisco using Google Earth Engine.
@@ -39,18 +276,159 @@ def get_san_francisco_tiles_and_images(
         resolution_mode: "standard", "high_res", or "ultra_high_res" for sub-meter detail
         save_json: Whether to save results to JSON file
         output_dir: Directory to save output files
+        output_format: "png" or "jpg" for visualized thumbnails (JPEG transfers
+            fewer bytes), or "NPY" for raw pixel download URLs (see
+            load_pixels_from_url)
+        datasets: Only query these datasets of the resolution mode (default: all)
+        pretty: Indent the saved JSON for reading (default: compact)
     
     Returns:
         Dictionary containing tiles info and image data
     """
+    point = {
+        'lat': lat,
+        'lon': lon,
+        'zoom_level': zoom_level,
+        'buffer_size': buffer_size,
+        'resolution_mode': resolution_mode,
+        'output_dir': output_dir
+    }
+    return get_tiles_and_images_batch(
+        [point],
+        start_date=start_date,
+        end_date=end_date,
+        save_json=save_json,
+        output_format=output_format,
+        datasets=datasets,
+        pretty=pretty
+    )[0]
+
+def get_tiles_and_images_batch(
+    points: List[Dict],
+    start_date: str = "2023-01-01",
+    end_date: str = "2023-12-31",
+    save_json: bool = True,
+    output_format: str = "png",
+    datasets: Optional[List[str]] = None,
+    pretty: bool = False
+) -> List[Dict]:
+    """
+    Get tiles information and images for several points at once.
+    
+    Metadata and collection sizes for every point come back in a single
+    Earth Engine request, and all image URLs and tile grids are fetched
+    concurrently on one pool.
+    
+    Args:
+        points: Point configurations, each with 'lat' and 'lon' and optionally
+            'zoom_level' (default: 12), 'buffer_size' (default: 1000m),
+            'resolution_mode' (default: "standard") and 'output_dir'
+            (default: "output")
+        start_date: Start date for image collection (YYYY-MM-DD)
+        end_date: End date for image collection (YYYY-MM-DD)
+        save_json: Whether to save each result to a JSON file, named with
+            the point's index in points when there is more than one
+        output_format: "png" or "jpg" for visualized thumbnails (JPEG transfers
+            fewer bytes), or "NPY" for raw pixel download URLs (see
+            load_pixels_from_url)
+        datasets: Only query these datasets of each resolution mode (default: all)
+        pretty: Indent the saved JSON for reading (default: compact)
+    
+    Returns:
+        List of result dictionaries, in the same order as points
+    """
     initialize_earth_engine()
     
-    # Create output directory if it doesn't exist
-    if save_json and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    resolved = [_resolve_point(point) for point in points]
+    
+    # Points at the same location (e.g. one place in several modes) share one
+    # collection query over the widest of their areas, which each point then
+    # narrows to its own area; Earth Engine evaluates the shared part once
+    buffers_by_location = {}
+    for point in resolved:
+        buffers_by_location.setdefault((point['lat'], point['lon']), []).append(point['buffer_size'])
+    shared_bounds = {
+        (lat, lon): (lat, lon, max(buffers))
+        for (lat, lon), buffers in buffers_by_location.items() if len(buffers) > 1
+    }
+    
+    plans = [
+        _plan_point(point, start_date, end_date, datasets, shared_bounds.get((point['lat'], point['lon'])))
+        for point in resolved
+    ]
     
-    # Create a point geometry
-    point = ee.Geometry.Point([lon, lat])
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Tile math runs on the pool while the Earth Engine requests are in flight
+        tiles_futures = [
+            executor.submit(calculate_tiles_for_area, plan['lat'], plan['lon'], plan['zoom_level'], plan['buffer_size'])
+            for plan in plans
+        ]
+        summary_future = executor.submit(_fetch_summaries, plans)
+        url_futures = [_submit_image_urls(executor, plan, output_format) for plan in plans]
+        
+        try:
+            summaries = summary_future.result()
+        except Exception as e:
+            logger.error(f"Error getting metadata: {e}")
+            summaries = [{} for _ in plans]
+        
+        results = []
+        for i, (plan, tiles_future, urls, summary_info) in enumerate(zip(plans, tiles_futures, url_futures, summaries)):
+            image_urls, metadata, collection_counts = _collect_images(plan, urls, summary_info)
+            
+            # Prepare final result
+            now = datetime.now()
+            result = {
+                'timestamp': now.isoformat(),
+                'location': {
+                    'latitude': plan['lat'],
+                    'longitude': plan['lon'],
+                    'buffer_size_meters': plan['buffer_size']
+                },
+                'configuration': {
+                    'resolution_mode': plan['resolution_mode'],
+                    'zoom_level': plan['zoom_level'],
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'output_format': output_format
+                },
+                'tiles_info': tiles_future.result(),
+                'image_urls': image_urls,
+                'metadata': metadata,
+                'image_collections_info': {
+                    f'{dataset_name}_count': count
+                    for dataset_name, count in collection_counts.items()
+                }
+            }
+            
+            # Save JSON if requested with organized directory structure
+            if save_json:
+                data_dir = Path(plan['output_dir']) / "data"
+                data_dir.mkdir(parents=True, exist_ok=True)
+                # Points of one batch are saved within the same second, so
+                # their filenames also carry the point's index in the batch
+                suffix = f"_{i}" if len(plans) > 1 else ""
+                filepath = _save_result(result, data_dir, f"earth_engine_data_{plan['resolution_mode']}_{now:%Y%m%d_%H%M%S}{suffix}.json", pretty)
+                if filepath:
+                    result['saved_to'] = filepath
+            
+            results.append(result)
+    
+    return results
+
+def _resolve_point(point: Dict) -> Dict:
+    """
+    Fill in a point configuration's defaults and its resolution mode limits.
+    
+    Args:
+        point: Point configuration (see get_tiles_and_images_batch)
+    
+    Returns:
+        Dictionary with lat, lon, zoom_level, buffer_size, resolution_mode and output_dir
+    """
+    zoom_level = point.get('zoom_level', 12)
+    buffer_size = point.get('buffer_size', 1000)
+    resolution_mode = point.get('resolution_mode', "standard")
     
     # Adjust buffer size and zoom for resolution mode
     if resolution_mode == "high_res":
@@ -62,420 +440,391 @@ def get_san_francisco_tiles_and_images(
         buffer_size = min(buffer_size, 50)   # Cap at 50m for ultra-high detail
         zoom_level = max(zoom_level, 20)     # Minimum zoom 20 for building level
     
-    # Create a buffer around the point
-    area = point.buffer(buffer_size)
+    return {
+        'lat': point['lat'],
+        'lon': point['lon'],
+        'zoom_level': zoom_level,
+        'buffer_size': buffer_size,
+        'resolution_mode': resolution_mode,
+        'output_dir': point.get('output_dir', "output")
+    }
+
+def _plan_point(
+    point: Dict,
+    start_date: str,
+    end_date: str,
+    datasets: Optional[List[str]],
+    shared_bounds: Optional[Tuple[float, float, int]] = None
+) -> Dict:
+    """
+    Build a resolved point's area, collections and best images.
     
-    # Get imagery based on resolution mode
-    if resolution_mode == "ultra_high_res":
-        # Ultra-high resolution mode - sub-meter precision for building/street level detail
-        
-        # SkySat imagery (0.5-1m resolution) - commercial high-res
-        skysat_collection = None
-        try:
-            skysat_collection = (ee.ImageCollection('SKYSAT/GEN-A/PUBLIC/ORTHO/RGB')
-                               .filterBounds(area)
-                               .filterDate(start_date, end_date)
-                               .filter(ee.Filter.lt('CLOUD_COVER', 5))
-                               .sort('CLOUD_COVER'))
-        except:
-            pass
-        
-        # WorldView imagery (0.3-0.5m resolution) - commercial very high-res
-        worldview_collection = None
-        try:
-            worldview_collection = (ee.ImageCollection('WORLDVIEW/WV04/PANSHARPENED')
-                                  .filterBounds(area)
-                                  .filterDate(start_date, end_date)
-                                  .filter(ee.Filter.lt('cloud_cover', 5))
-                                  .sort('cloud_cover'))
-        except:
-            pass
-        
-        # GeoEye-1 imagery (0.5m resolution) - commercial high-res
-        geoeye_collection = None
-        try:
-            geoeye_collection = (ee.ImageCollection('GEOEYE/GE01/PANSHARPENED')
-                               .filterBounds(area)
-                               .filterDate(start_date, end_date)
-                               .filter(ee.Filter.lt('cloud_cover', 5))
-                               .sort('cloud_cover'))
-        except:
-            pass
-        
-        # NAIP imagery (1m resolution) - highest free resolution for US
-        naip_collection = None
-        try:
-            naip_collection = (ee.ImageCollection('USDA/NAIP/DOQQ')
-                             .filterBounds(area)
-                             .filterDate('2018-01-01', '2022-12-31')
-                             .sort('system:time_start', False))
-        except:
-            pass
-        
-        # Sentinel-2 MSI (10m resolution) - backup
-        sentinel_collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                              .filterBounds(area)
-                              .filterDate(start_date, end_date)
-                              .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 5))
-                              .sort('CLOUDY_PIXEL_PERCENTAGE'))
-        
-    elif resolution_mode == "high_res":
-        # Use high-resolution datasets for block-level analysis
-        
-        # PlanetScope imagery (3-5m resolution) - if available
-        planet_collection = None
-        try:
-            planet_collection = (ee.ImageCollection('PLANET/PSScene/Visual')
-                               .filterBounds(area)
-                               .filterDate(start_date, end_date)
-                               .filter(ee.Filter.lt('cloud_cover', 0.1))
-                               .sort('cloud_cover'))
-        except:
-            pass
-        
-        # Sentinel-2 (10m resolution) - primary for high-res
-        sentinel_collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                              .filterBounds(area)
-                              .filterDate(start_date, end_date)
-                              .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 10))
-                              .sort('CLOUDY_PIXEL_PERCENTAGE'))
-        
-        # NAIP imagery (1m resolution) - if available in US
-        naip_collection = None
-        try:
-            naip_collection = (ee.ImageCollection('USDA/NAIP/DOQQ')
-                             .filterBounds(area)
-                             .filterDate('2018-01-01', '2022-12-31')  # NAIP has limited temporal coverage
-                             .sort('system:time_start', False))
-        except:
-            pass
-        
-        # Landsat (30m) - backup
-        landsat_collection = (ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
-                             .filterBounds(area)
-                             .filterDate(start_date, end_date)
-                             .filter(ee.Filter.lt('CLOUD_COVER', 10))
-                             .sort('CLOUD_COVER'))
-    else:
-        # Standard resolution datasets
-        landsat_collection = (ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
-                             .filterBounds(area)
-                             .filterDate(start_date, end_date)
-                             .filter(ee.Filter.lt('CLOUD_COVER', 20))
-                             .sort('CLOUD_COVER'))
-        
-        sentinel_collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                              .filterBounds(area)
-                              .filterDate(start_date, end_date)
-                              .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
-                              .sort('CLOUDY_PIXEL_PERCENTAGE'))
-    
-    # Get the best (least cloudy) images
-    best_images = {}
-    
-    if resolution_mode == "ultra_high_res":
-        # Ultra-high resolution mode - get best from each dataset
-        if 'worldview_collection' in locals() and worldview_collection:
-            try:
-                best_images['worldview'] = worldview_collection.first()
-            except:
-                pass
-        
-        if 'geoeye_collection' in locals() and geoeye_collection:
-            try:
-                best_images['geoeye'] = geoeye_collection.first()
-            except:
-                pass
-        
-        if 'skysat_collection' in locals() and skysat_collection:
-            try:
-                best_images['skysat'] = skysat_collection.first()
-            except:
-                pass
-        
-        if 'naip_collection' in locals() and naip_collection:
-            try:
-                best_images['naip'] = naip_collection.first()
-            except:
-                pass
-        
-        best_images['sentinel'] = sentinel_collection.first()
-        
-    elif resolution_mode == "high_res":
-        # High resolution mode - get best from each dataset
-        if 'naip_collection' in locals() and naip_collection:
-            try:
-                best_images['naip'] = naip_collection.first()
-            except:
-                pass
-        
-        if 'planet_collection' in locals() and planet_collection:
-            try:
-                best_images['planet'] = planet_collection.first()
-            except:
-                pass
-        
-        best_images['sentinel'] = sentinel_collection.first()
-        best_images['landsat'] = landsat_collection.first()
-    else:
-        # Standard mode
-        best_images['landsat'] = landsat_collection.first()
-        best_images['sentinel'] = sentinel_collection.first()
+    Only builds lazy Earth Engine objects; no request is made here.
+    
+    Args:
+        point: Resolved point from _resolve_point
+        start_date: Start date for image collection (YYYY-MM-DD)
+        end_date: End date for image collection (YYYY-MM-DD)
+        datasets: Only include these datasets (default: all of the mode)
+        shared_bounds: (lat, lon, buffer) of a wider area to prefilter the
+            collections by, shared with other points at this location
     
-    # Calculate tiles for the area
-    tiles_info = calculate_tiles_for_area(lat, lon, zoom_level, buffer_size)
+    Returns:
+        Dictionary with the resolved point parameters and Earth Engine objects
+    """
+    lat, lon = point['lat'], point['lon']
+    buffer_size, resolution_mode = point['buffer_size'], point['resolution_mode']
     
-    # Get image URLs with higher resolution for high_res mode
-    image_urls = {}
-    dimensions = 2048 if resolution_mode == "ultra_high_res" else (1024 if resolution_mode == "high_res" else 512)
+    # Create the buffered point geometry once; it is shared by every collection
+    area = ee.Geometry.Point([lon, lat]).buffer(buffer_size)
     
-    try:
-        # WorldView visualization parameters (0.3-0.5m resolution) - highest commercial
-        if 'worldview' in best_images and best_images['worldview']:
-            worldview_url = best_images['worldview'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png'
-            })
-            image_urls['worldview'] = worldview_url
-        
-        # GeoEye-1 visualization parameters (0.5m resolution) - commercial high-res
-        if 'geoeye' in best_images and best_images['geoeye']:
-            geoeye_url = best_images['geoeye'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png'
-            })
-            image_urls['geoeye'] = geoeye_url
-        
-        # SkySat visualization parameters (0.5-1m resolution) - commercial high-res
-        if 'skysat' in best_images and best_images['skysat']:
-            skysat_url = best_images['skysat'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png'
-            })
-            image_urls['skysat'] = skysat_url
-        
-        # NAIP visualization parameters (1m resolution)
-        if 'naip' in best_images and best_images['naip']:
-            naip_url = best_images['naip'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png'
-            })
-            image_urls['naip'] = naip_url
-        
-        # Planet visualization parameters (3-5m resolution)
-        if 'planet' in best_images and best_images['planet']:
-            planet_url = best_images['planet'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png'
-            })
-            image_urls['planet'] = planet_url
-        
-        # Sentinel-2 visualization parameters (10m resolution)
-        sentinel_vis_params = {
-            'bands': ['B4', 'B3', 'B2'],
-            'min': 0.0,
-            'max': 3000,
-            'gamma': 1.4
-        }
-        
-        if 'sentinel' in best_images and best_images['sentinel']:
-            sentinel_url = best_images['sentinel'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png',
-                **sentinel_vis_params
-            })
-            image_urls['sentinel'] = sentinel_url
-        
-        # Landsat visualization parameters (30m resolution)
-        landsat_vis_params = {
-            'bands': ['SR_B4', 'SR_B3', 'SR_B2'],
-            'min': 0.0,
-            'max': 0.3,
-            'gamma': 1.4
+    # Only the requested datasets' collections are built
+    collections = _build_collections(area, resolution_mode, start_date, end_date, datasets, shared_bounds)
+    
+    return {
+        **point,
+        'area': area,
+        # Use higher thumbnail dimensions for the high resolution modes
+        'dimensions': 2048 if resolution_mode == "ultra_high_res" else (1024 if resolution_mode == "high_res" else 512),
+        # Get the best (least cloudy) images
+        'best_images': {name: collection.first() for name, collection in collections.items()},
+        # Collections whose sizes are reported in image_collections_info;
+        # Landsat and Sentinel counts are always reported unless filtered out
+        'count_collections': {
+            **{
+                name: collections.get(name)
+                for name in ('landsat', 'sentinel')
+                if datasets is None or name in datasets
+            },
+            **collections
         }
-        
-        if 'landsat' in best_images and best_images['landsat']:
-            landsat_url = best_images['landsat'].getThumbURL({
-                'region': area,
-                'dimensions': dimensions,
-                'format': 'png',
-                **landsat_vis_params
-            })
-            image_urls['landsat'] = landsat_url
-            
-    except Exception as e:
-        print(f"Error getting image URLs: {e}")
-        image_urls = {}
+    }
+
+@functools.lru_cache(maxsize=128)
+def _get_collection(name: str, start_date: str, end_date: str) -> ee.ImageCollection:
+    """
+    Get a dataset's date-filtered collection, independent of location.
     
-    # Get image metadata
-    metadata = {}
+    Memoized so repeated calls (e.g. looping over locations) reuse the same
+    collection object instead of rebuilding the filter chain each time.
+    
+    Args:
+        name: Dataset name in DATASETS
+        start_date: Start date for image collection (YYYY-MM-DD)
+        end_date: End date for image collection (YYYY-MM-DD)
+    
+    Returns:
+        Date-filtered (not yet bounded, cloud-filtered or sorted) image collection
+    """
+    spec = DATASETS[name]
+    return (ee.ImageCollection(spec['collection'])
+            .filterDate(*spec.get('date_range', (start_date, end_date))))
+
+@functools.lru_cache(maxsize=128)
+def _get_bounded_collection(name: str, start_date: str, end_date: str,
+                            lat: float, lon: float, buffer_meters: int) -> ee.ImageCollection:
+    """
+    Get a dataset's date-filtered collection over a buffered point.
+    
+    Memoized so every resolution mode queried at one location builds on the
+    same collection object.
+    
+    Args:
+        name: Dataset name in DATASETS
+        start_date: Start date for image collection (YYYY-MM-DD)
+        end_date: End date for image collection (YYYY-MM-DD)
+        lat: Latitude of the point
+        lon: Longitude of the point
+        buffer_meters: Buffer around the point in meters
+    
+    Returns:
+        Date- and bounds-filtered image collection
+    """
+    area = ee.Geometry.Point([lon, lat]).buffer(buffer_meters)
+    return _get_collection(name, start_date, end_date).filterBounds(area)
+
+def _build_collections(
+    area: ee.Geometry,
+    resolution_mode: str,
+    start_date: str,
+    end_date: str,
+    datasets: Optional[List[str]] = None,
+    shared_bounds: Optional[Tuple[float, float, int]] = None
+) -> Dict[str, ee.ImageCollection]:
+    """
+    Build the filtered image collections used by a resolution mode.
+    
+    Datasets that are not requested are skipped before any collection is
+    constructed for them.
+    
+    Args:
+        area: Region the collections must intersect
+        resolution_mode: "standard", "high_res", or "ultra_high_res"
+        start_date: Start date for image collection (YYYY-MM-DD)
+        end_date: End date for image collection (YYYY-MM-DD)
+        datasets: Only build these datasets of the mode (default: all)
+        shared_bounds: (lat, lon, buffer) of a wider area containing area to
+            prefilter by, so points at one location share that query
+    
+    Returns:
+        Mapping of dataset name to collection, in reporting order
+    """
+    # Unknown modes fall back to the standard datasets
+    if resolution_mode not in MODE_DATASETS:
+        resolution_mode = "standard"
+    
+    def _filtered(name):
+        # Collection over the area and date range, least cloudy (or newest) first
+        if shared_bounds is None:
+            collection = _get_collection(name, start_date, end_date)
+        else:
+            collection = _get_bounded_collection(name, start_date, end_date, *shared_bounds)
+        spec = DATASETS[name]
+        cloud_prop = spec['cloud_property']
+        if cloud_prop is None:
+            return collection.filterBounds(area).sort('system:time_start', False)
+        thresh = CLOUD_THRESHOLDS[resolution_mode] * spec.get('cloud_scale', 1)
+        return collection.filter(ee.Filter.lt(cloud_prop, thresh)).filterBounds(area).sort(cloud_prop)
+    
+    return {
+        name: _filtered(name)
+        for name in MODE_DATASETS[resolution_mode]
+        if datasets is None or name in datasets
+    }
+
+def _fetch_summaries(plans: List[Dict]) -> List[Dict]:
+    """
+    Fetch metadata properties and collection sizes for all points in one request.
+    
+    Every dataset's first() image and size() for every point are packed into
+    a single server-side ee.List of ee.Dictionary objects and evaluated with
+    one computeValue call, so Earth Engine can share the filter sub-graphs
+    between datasets. Thumbnail and download URLs cannot be part of this
+    batch: getThumbURL and getDownloadURL are client-side calls that each
+    register their own image resource, so they are requested separately.
+    
+    If the batch fails (e.g. one collection is not accessible to the
+    account), each point is retried on its own, and within a failing point
+    each dataset, so only the failing datasets are left out.
+    
+    Args:
+        plans: Resolved points from _plan_point
+    
+    Returns:
+        Per point, a mapping of dataset name to {'props': {...}, 'count': int}
+    """
     try:
-        for dataset_name, image in best_images.items():
-            if image:
-                try:
-                    props = image.getInfo()['properties']
-                    if dataset_name == 'landsat':
-                        metadata[dataset_name] = {
-                            'date': props.get('DATE_ACQUIRED'),
-                            'cloud_cover': props.get('CLOUD_COVER'),
-                            'scene_id': props.get('LANDSAT_SCENE_ID'),
-                            'resolution': '30m'
-                        }
-                    elif dataset_name == 'sentinel':
-                        metadata[dataset_name] = {
-                            'date': props.get('PRODUCT_ID', '').split('_')[2][:8] if 'PRODUCT_ID' in props else None,
-                            'cloud_cover': props.get('CLOUDY_PIXEL_PERCENTAGE'),
-                            'product_id': props.get('PRODUCT_ID'),
-                            'resolution': '10m'
-                        }
-                    elif dataset_name == 'worldview':
-                        metadata[dataset_name] = {
-                            'date': props.get('acquisition_date'),
-                            'cloud_cover': props.get('cloud_cover'),
-                            'resolution': '0.3-0.5m',
-                            'dataset': 'WorldView'
-                        }
-                    elif dataset_name == 'geoeye':
-                        metadata[dataset_name] = {
-                            'date': props.get('acquisition_date'),
-                            'cloud_cover': props.get('cloud_cover'),
-                            'resolution': '0.5m',
-                            'dataset': 'GeoEye-1'
-                        }
-                    elif dataset_name == 'skysat':
-                        metadata[dataset_name] = {
-                            'date': props.get('ACQUIRED'),
-                            'cloud_cover': props.get('CLOUD_COVER'),
-                            'resolution': '0.5-1m',
-                            'dataset': 'SkySat'
-                        }
-                    elif dataset_name == 'naip':
-                        metadata[dataset_name] = {
-                            'date': props.get('system:time_start'),
-                            'resolution': '1m',
-                            'dataset': 'NAIP'
-                        }
-                    elif dataset_name == 'planet':
-                        metadata[dataset_name] = {
-                            'date': props.get('acquired'),
-                            'cloud_cover': props.get('cloud_cover'),
-                            'resolution': '3-5m',
-                            'dataset': 'PlanetScope'
-                        }
-                except Exception as e:
-                    print(f"Error getting metadata for {dataset_name}: {e}")
-                    
+        return ee.data.computeValue(ee.List([_point_summary_dict(plan) for plan in plans]))
     except Exception as e:
-        print(f"Error getting metadata: {e}")
-        metadata = {}
-    
-    # Prepare final result
-    result = {
-        'timestamp': datetime.now().isoformat(),
-        'location': {
-            'latitude': lat,
-            'longitude': lon,
-            'buffer_size_meters': buffer_size
-        },
-        'configuration': {
-            'resolution_mode': resolution_mode,
-            'zoom_level': zoom_level,
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'tiles_info': tiles_info,
-        'image_urls': image_urls,
-        'metadata': metadata,
-        'image_collections_info': {
-            'landsat_count': landsat_collection.size().getInfo() if 'landsat_collection' in locals() and landsat_collection else 0,
-            'sentinel_count': sentinel_collection.size().getInfo() if 'sentinel_collection' in locals() and sentinel_collection else 0
-        }
+        if len(plans) == 1:
+            logger.warning(f"Metadata request failed, retrying per dataset: {e}")
+            return [_fetch_datasets_summary(plans[0])]
+        logger.warning(f"Batched metadata request failed, retrying per point: {e}")
+    
+    summaries = []
+    for plan in plans:
+        try:
+            summaries.append(ee.data.computeValue(_point_summary_dict(plan)))
+        except Exception as e:
+            logger.warning(f"Metadata request failed, retrying per dataset: {e}")
+            summaries.append(_fetch_datasets_summary(plan))
+    return summaries
+
+def _fetch_datasets_summary(plan: Dict) -> Dict:
+    """
+    Fetch a point's metadata with one request per dataset.
+    
+    Args:
+        plan: Resolved point from _plan_point
+    
+    Returns:
+        Mapping of dataset name to {'props': {...}, 'count': int}, without
+        the datasets whose request failed
+    """
+    summary_info = {}
+    for name, collection in plan['count_collections'].items():
+        if not collection:
+            continue
+        try:
+            summary_info[name] = ee.data.computeValue(_summary_dict(plan, name, collection))
+        except Exception as e:
+            logger.error(f"Error getting metadata for {name}: {e}")
+    return summary_info
+
+def _point_summary_dict(plan: Dict) -> ee.Dictionary:
+    """Build the server-side summaries of every dataset of a point."""
+    return ee.Dictionary({
+        name: _summary_dict(plan, name, collection)
+        for name, collection in plan['count_collections'].items() if collection
+    })
+
+def _summary_dict(plan: Dict, name: str, collection: ee.ImageCollection) -> ee.Dictionary:
+    """
+    Build the server-side summary of one dataset of a point.
+    
+    Empty collections yield a null image, which is handled server-side with
+    ee.Algorithms.If.
+    
+    Args:
+        plan: Resolved point from _plan_point
+        name: Dataset name in DATASETS
+        collection: The dataset's filtered collection
+    
+    Returns:
+        ee.Dictionary with the best image's 'props' and the collection 'count'
+    """
+    best_image = plan['best_images'][name]
+    return ee.Dictionary({
+        'props': ee.Algorithms.If(
+            best_image,
+            best_image.toDictionary(list(dict.fromkeys(DATASETS[name]['prop_map'].values()))),
+            ee.Dictionary({})
+        ),
+        'count': collection.size()
+    })
+
+def _submit_image_urls(executor: ThreadPoolExecutor, plan: Dict, output_format: str) -> Dict[str, Future]:
+    """
+    Submit one image URL request per dataset of a point.
+    
+    Args:
+        executor: Pool to run the Earth Engine requests on
+        plan: Resolved point from _plan_point
+        output_format: "png", "jpg" or "NPY"
+    
+    Returns:
+        Mapping of dataset name to URL future
+    """
+    area, dimensions = plan['area'], plan['dimensions']
+    
+    def _image_url(name, image):
+        if output_format == "NPY":
+            # Raw pixels skip the server-side PNG encode and 8-bit quantization
+            params = {'region': area, 'dimensions': dimensions, 'format': 'NPY'}
+            if DATASETS[name]['bands']:
+                params['bands'] = DATASETS[name]['bands']
+            return image.getDownloadURL(params)
+        return image.getThumbURL({
+            'region': area,
+            'dimensions': dimensions,
+            'format': output_format,
+            **DATASETS[name]['extra_vis']
+        })
+    
+    return {
+        name: executor.submit(_image_url, name, image)
+        for name, image in plan['best_images'].items() if image
     }
+
+def _collect_images(plan: Dict, url_futures: Dict[str, Future], summary_info: Dict) -> Tuple[Dict, Dict, Dict]:
+    """
+    Collect a point's image URLs, metadata and collection sizes.
     
-    # Add high-res and ultra-high-res specific collection info
-    if resolution_mode == "ultra_high_res":
-        if 'worldview_collection' in locals() and worldview_collection:
-            try:
-                result['image_collections_info']['worldview_count'] = worldview_collection.size().getInfo()
-            except:
-                result['image_collections_info']['worldview_count'] = 0
-        
-        if 'geoeye_collection' in locals() and geoeye_collection:
-            try:
-                result['image_collections_info']['geoeye_count'] = geoeye_collection.size().getInfo()
-            except:
-                result['image_collections_info']['geoeye_count'] = 0
-        
-        if 'skysat_collection' in locals() and skysat_collection:
-            try:
-                result['image_collections_info']['skysat_count'] = skysat_collection.size().getInfo()
-            except:
-                result['image_collections_info']['skysat_count'] = 0
-        
-        if 'naip_collection' in locals() and naip_collection:
-            try:
-                result['image_collections_info']['naip_count'] = naip_collection.size().getInfo()
-            except:
-                result['image_collections_info']['naip_count'] = 0
+    A failing dataset is reported and skipped without affecting the others.
     
-    elif resolution_mode == "high_res":
-        if 'naip_collection' in locals() and naip_collection:
-            try:
-                result['image_collections_info']['naip_count'] = naip_collection.size().getInfo()
-            except:
-                result['image_collections_info']['naip_count'] = 0
-        
-        if 'planet_collection' in locals() and planet_collection:
+    Args:
+        plan: Resolved point from _plan_point
+        url_futures: Mapping of dataset name to URL future
+        summary_info: The point's entry from _fetch_summaries
+    
+    Returns:
+        Tuple of (image_urls, metadata, collection_counts) dictionaries
+    """
+    # Collect image URLs and metadata in a single pass over the datasets
+    image_urls = {}
+    metadata = {}
+    for dataset_name in plan['best_images']:
+        if dataset_name in url_futures:
             try:
-                result['image_collections_info']['planet_count'] = planet_collection.size().getInfo()
-            except:
-                result['image_collections_info']['planet_count'] = 0
-    
-    # Save JSON if requested with organized directory structure
-    if save_json:
-        # Create organized directory structure
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        data_dir = os.path.join(output_dir, "data")
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-        
-        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"earth_engine_data_{resolution_mode}_{timestamp_str}.json"
-        filepath = os.path.join(data_dir, filename)
+                image_urls[dataset_name] = url_futures[dataset_name].result()
+            except Exception as e:
+                logger.error(f"Error getting image URL for {dataset_name}: {e}")
         
+        # Only datasets that returned an image have metadata
+        info = summary_info.get(dataset_name)
+        if not info or not info['count']:
+            continue
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            print(f"Data saved to: {filepath}")
-            result['saved_to'] = filepath
+            spec = DATASETS[dataset_name]
+            props = info['props']
+            meta = {key: props.get(prop) for key, prop in spec['prop_map'].items()}
+            if 'date_parser' in spec and meta['date'] is not None:
+                meta['date'] = spec['date_parser'](meta['date'])
+            meta['resolution'] = spec['resolution']
+            if 'dataset' in spec:
+                meta['dataset'] = spec['dataset']
+            metadata[dataset_name] = meta
         except Exception as e:
-            print(f"Error saving JSON: {e}")
+            logger.error(f"Error getting metadata for {dataset_name}: {e}")
     
-    return result
+    # Get collection sizes, falling back to 0 for unavailable collections
+    collection_counts = {
+        dataset_name: summary_info.get(dataset_name, {}).get('count', 0)
+        for dataset_name in plan['count_collections']
+    }
+    
+    return image_urls, metadata, collection_counts
 
-def calculate_tiles_for_area(lat: float, lon: float, zoom: int, buffer_meters: int) -> Dict:
+def _save_result(result: Dict, data_dir: Path, filename: str, pretty: bool = False) -> Optional[str]:
     """
-    Calculate tile coordinates for a given area.
+    Save a result dictionary as JSON.
     
     Args:
-        lat: Latitude
-        lon: Longitude
+        result: Result dictionary
+        data_dir: Existing directory to save into
+        filename: JSON filename
+        pretty: Indent the JSON instead of writing it compactly
+    
+    Returns:
+        Path of the saved file, or None if saving failed
+    """
+    filepath = str(data_dir / filename)
+    try:
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(result, option=option))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                if pretty:
+                    json.dump(result, f, indent=2, ensure_ascii=False)
+                else:
+                    json.dump(result, f, separators=(',', ':'), ensure_ascii=False)
+        logger.info(f"Data saved to: {filepath}")
+        return filepath
+    except Exception as e:
+        logger.error(f"Error saving JSON: {e}")
+        return None
+
+def deg2tile(lat_deg: np.ndarray, lon_deg: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert arrays of lat/lon coordinates to slippy map tile coordinates.
+    
+    Args:
+        lat_deg: Latitudes in degrees
+        lon_deg: Longitudes in degrees
         zoom: Zoom level
-        buffer_meters: Buffer size in meters
     
     Returns:
-        Dictionary with tile information
+        Tuple of (x, y) integer tile coordinate arrays
     """
-    import math
+    n = 2.0 ** zoom
+    lat_rad = np.radians(lat_deg)
+    x = ((lon_deg + 180.0) / 360.0 * n).astype(np.int64)
+    y = ((1.0 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2.0 * n).astype(np.int64)
+    return x, y
+
+@functools.lru_cache(maxsize=128)
+def _tiles_cached(lat: float, lon: float, zoom: int, buffer_meters: int) -> Tuple:
+    """
+    Compute the bounding box and tile grid for an area (memoized).
     
+    Returns:
+        Tuple of ((north, south, east, west), xs, ys, urls) with immutable
+        tuples so cached values cannot be modified by callers
+    """
     # Convert buffer from meters to degrees (approximate)
     lat_buffer = buffer_meters / 111000  # 1 degree lat ≈ 111km
     lon_buffer = buffer_meters / (111000 * math.cos(math.radians(lat)))
@@ -486,27 +835,43 @@ def calculate_tiles_for_area(lat: float, lon: float, zoom: int, buffer_meters: i
     east = lon + lon_buffer
     west = lon - lon_buffer
     
-    # Convert lat/lon to tile coordinates
-    def deg2tile(lat_deg, lon_deg, zoom):
-        lat_rad = math.radians(lat_deg)
-        n = 2.0 ** zoom
-        x = int((lon_deg + 180.0) / 360.0 * n)
-        y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
-        return (x, y)
-    
-    # Get tile bounds
-    x_min, y_max = deg2tile(south, west, zoom)
-    x_max, y_min = deg2tile(north, east, zoom)
-    
-    tiles = []
-    for x in range(x_min, x_max + 1):
-        for y in range(y_min, y_max + 1):
-            tiles.append({
-                'x': x,
-                'y': y,
-                'z': zoom,
-                'url': f"https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={zoom}"
-            })
+    # Get tile bounds for the south-west and north-east corners in one call
+    (x_min, x_max), (y_max, y_min) = deg2tile(np.array([south, north]), np.array([west, east]), zoom)
+    x_min, x_max, y_min, y_max = int(x_min), int(x_max), int(y_min), int(y_max)
+    
+    # Enumerate every (x, y) tile in the bounds, x-major
+    xs, ys = np.meshgrid(np.arange(x_min, x_max + 1), np.arange(y_min, y_max + 1), indexing='ij')
+    xs = tuple(xs.ravel().tolist())
+    ys = tuple(ys.ravel().tolist())
+    urls = tuple(f"https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={zoom}" for x, y in zip(xs, ys))
+    
+    return (north, south, east, west), xs, ys, urls
+
+def calculate_tiles_for_area(lat: float, lon: float, zoom: int, buffer_meters: int) -> Dict:
+    """
+    Calculate tile coordinates for a given area.
+    
+    Results are cached per (lat, lon, zoom, buffer); coordinates are rounded
+    to 6 decimals (~0.1m) so nearly identical points share a cache entry.
+    
+    Args:
+        lat: Latitude
+        lon: Longitude
+        zoom: Zoom level
+        buffer_meters: Buffer size in meters
+    
+    Returns:
+        Dictionary with tile information
+    """
+    (north, south, east, west), xs, ys, urls = _tiles_cached(round(lat, 6), round(lon, 6), zoom, buffer_meters)
+    
+    # Tiles are stored as parallel lists rather than one dict per tile
+    tiles = {
+        'x': list(xs),
+        'y': list(ys),
+        'z': zoom,
+        'urls': list(urls)
+    }
     
     return {
         'zoom_level': zoom,
@@ -516,49 +881,228 @@ def calculate_tiles_for_area(lat: float, lon: float, zoom: int, buffer_meters: i
             'east': east,
             'west': west
         },
-        'tile_count': len(tiles),
+        'tile_count': len(xs),
         'tiles': tiles
     }
 
-def download_image_from_url(url: str, filename: str, output_dir: str = "output") -> bool:
+def load_pixels_from_url(url: str, session: Optional[requests.Session] = None) -> np.ndarray:
+    """
+    Fetch an NPY download URL (output_format="NPY") as a NumPy array.
+    
+    Args:
+        url: Image URL returned in image_urls
+        session: HTTP session to download with (default: shared pooled session)
+    
+    Returns:
+        Structured array with one field per band
+    """
+    response = (session or _SESSION).get(url, timeout=60)
+    response.raise_for_status()
+    return np.load(io.BytesIO(response.content))
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Hard-link src to dst, falling back to a copy across filesystems.
+    
+    The link is made under a temporary name and then replaces dst, so an
+    existing dst is left untouched if src is missing.
+    """
+    tmp = dst.with_name(f"{dst.name}.tmp")
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        try:
+            os.link(src, tmp)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+
+def _drop_page_cache(f) -> None:
+    """
+    Evict a just-written file from the OS page cache where supported.
+    
+    Dirty pages cannot be dropped, so the file is first flushed to disk,
+    which blocks until the write completes. Only worth it for large batches
+    whose files are not read back soon, since a later read has to go to disk.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    f.flush()
+    os.fdatasync(f.fileno())
+    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def _evict_cache(cache_dir: Path, max_bytes: int = CACHE_MAX_BYTES) -> None:
+    """Delete the least recently used cache entries until cache_dir fits in max_bytes."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.part'):
+                continue  # still being downloaded
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # evicted by a concurrent download
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def download_image_from_url(
+    url: str,
+    filename: str,
+    output_dir: str = "output",
+    use_cache: bool = False,
+    session: Optional[requests.Session] = None,
+    drop_page_cache: bool = False
+) -> bool:
     """
     Download an image from URL to local file in organized directory structure.
     
+    With use_cache, downloaded images are also kept in a cache under
+    output_dir/.cache keyed by URL hash, so re-downloads of an identical URL
+    are linked from disk instead of fetched again. The cache is capped at
+    CACHE_MAX_BYTES, evicting the least recently used entries. Earth Engine
+    mints a new URL for every getThumbURL call, so the cache only helps when
+    the same URLs are downloaded more than once.
+    
     Args:
         url: Image URL
         filename: Local filename to save
         output_dir: Output directory (default: "output")
+        use_cache: Whether to reuse and populate the download cache (default: False)
+        session: HTTP session to download with (default: shared pooled session)
+        drop_page_cache: Flush the file and evict it from the OS page cache
+            after writing, for bulk downloads that are not read back soon
+            (default: False)
     
     Returns:
         True if successful, False otherwise
     """
+    part_path = None
     try:
-        # Create output directory if it doesn't exist
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        # Create images subdirectory
-        images_dir = os.path.join(output_dir, "images")
-        if not os.path.exists(images_dir):
-            os.makedirs(images_dir)
+        # Create images subdirectory (may race with concurrent downloads)
+        images_dir = Path(output_dir) / "images"
+        images_dir.mkdir(parents=True, exist_ok=True)
         
         # Full path for the image file
-        filepath = os.path.join(images_dir, filename)
+        filepath = images_dir / filename
         
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+        if use_cache:
+            cache_dir = Path(output_dir) / ".cache"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+            cache_path = cache_dir / f"{key}{filepath.suffix}"
+            try:
+                _link_or_copy(cache_path, filepath)
+                os.utime(cache_path)  # mark as recently used
+                logger.info(f"Image saved to {filepath} (cached)")
+                return True
+            except FileNotFoundError:
+                pass  # not cached yet
         
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        # Stream the body to disk in 1 MiB chunks instead of buffering it in
+        # memory; it only replaces the target once the transfer completed, so
+        # a broken download never leaves a truncated image or cache entry
+        target = cache_path if use_cache else filepath
+        part_path = target.with_name(f"{target.name}.part")
+        with (session or _SESSION).get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(part_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+                if drop_page_cache:
+                    _drop_page_cache(f)
+        os.replace(part_path, target)
+        part_path = None
+        if use_cache:
+            _link_or_copy(cache_path, filepath)
+            _evict_cache(cache_dir)
         
-        print(f"Image saved to {filepath}")
+        logger.info(f"Image saved to {filepath}")
         return True
     except Exception as e:
-        print(f"Error downloading image {filename}: {e}")
+        logger.error(f"Error downloading image {filename}: {e}")
+        if part_path is not None:
+            try:
+                part_path.unlink()
+            except FileNotFoundError:
+                pass
         return False
 
+def download_images(
+    url_to_filename: Dict[str, str],
+    output_dir: str = "output",
+    use_cache: bool = False,
+    session: Optional[requests.Session] = None,
+    drop_page_cache: bool = False
+) -> Dict[str, bool]:
+    """
+    Download several images concurrently into the organized directory structure.
+    
+    Args:
+        url_to_filename: Mapping of image URL to local filename
+        output_dir: Output directory (default: "output")
+        use_cache: Whether to reuse and populate the download cache (default: False)
+        session: HTTP session to download with (default: shared pooled session)
+        drop_page_cache: Evict each file from the OS page cache after writing
+            (default: False, see download_image_from_url)
+    
+    Returns:
+        Mapping of image URL to download success
+    """
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = {
+            url: executor.submit(download_image_from_url, url, filename, output_dir, use_cache, session, drop_page_cache)
+            for url, filename in url_to_filename.items()
+        }
+    return {url: future.result() for url, future in futures.items()}
+
+def convert_image_to_webp(filepath: str, quality: int = 85) -> str:
+    """
+    Re-encode a downloaded image as WebP, replacing the original file.
+    
+    Requires Pillow; without it the file is left as downloaded.
+    
+    Args:
+        filepath: Path of the downloaded image
+        quality: WebP quality, 0-100 (default: 85)
+    
+    Returns:
+        Path of the WebP file, or the original path if it was not converted
+    """
+    if Image is None:
+        return filepath
+    
+    webp_path = str(Path(filepath).with_suffix('.webp'))
+    try:
+        with Image.open(filepath) as img:
+            img.save(webp_path, 'WEBP', quality=quality, method=6)
+        os.remove(filepath)
+        return webp_path
+    except Exception as e:
+        logger.error(f"Error converting {filepath} to WebP: {e}")
+        return filepath
+
 # Example usage
 if __name__ == "__main__":
+    configure_logging()
+    
     # San Francisco coordinates (downtown)
     sf_lat = 37.7749
     sf_lon = -122.4194
@@ -579,9 +1123,10 @@ if __name__ == "__main__":
         print(f"Available images: {list(result_standard['image_urls'].keys())}")
         
         # Download images if URLs are available
-        for dataset, url in result_standard['image_urls'].items():
-            filename = f"sf_{dataset}_standard.png"
-            download_image_from_url(url, filename, "output/standard")
+        download_images({
+            url: f"sf_{dataset}_standard.png"
+            for dataset, url in result_standard['image_urls'].items()
+        }, "output/standard")
             
     except Exception as e:
         print(f"Error in standard mode: {e}")
@@ -605,9 +1150,10 @@ if __name__ == "__main__":
             print(f"  {dataset}: {meta.get('resolution', 'Unknown')} resolution")
         
         # Download high-res images
-        for dataset, url in result_highres['image_urls'].items():
-            filename = f"sf_{dataset}_highres.png"
-            download_image_from_url(url, filename, "output/high_res")
+        download_images({
+            url: f"sf_{dataset}_highres.png"
+            for dataset, url in result_highres['image_urls'].items()
+        }, "output/high_res")
             
     except Exception as e:
         print(f"Error in high-res mode: {e}")
@@ -631,9 +1177,10 @@ if __name__ == "__main__":
             print(f"  {dataset}: {meta.get('resolution', 'Unknown')} resolution")
         
         # Download ultra-high-res images
-        for dataset, url in result_ultrahighres['image_urls'].items():
-            filename = f"sf_{dataset}_ultrahighres.png"
-            download_image_from_url(url, filename, "output/ultra_high_res")
+        download_images({
+            url: f"sf_{dataset}_ultrahighres.png"
+            for dataset, url in result_ultrahighres['image_urls'].items()
+        }, "output/ultra_high_res")
             
     except Exception as e:
         print(f"Error in ultra-high-res mode: {e}")
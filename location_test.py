@@ -3,218 +3,289 @@
 Test different global locations for data availability
 """
 
-from earth_engine_utils import get_san_francisco_tiles_and_images
+from earth_engine_utils import configure_logging, get_san_francisco_tiles_and_images, initialize_earth_engine, slugify
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import itemgetter
+from typing import Tuple
+import ee
+import functools
+import io
+import itertools
 import json
+import sys
+
+@dataclass(frozen=True)
+class LocSpec:
+    """A test location and the coverage expected there."""
+    name: str
+    lat: float
+    lon: float
+    expected_datasets: Tuple[str, ...]
+    coverage: str
+    slug: str = field(init=False)
+    
+    def __post_init__(self):
+        # Sanitize the name once rather than on every call that needs a path
+        object.__setattr__(self, 'slug', slugify(self.name))
+
+# Test locations across different continents and data coverage zones
+TEST_LOCATIONS: Tuple[LocSpec, ...] = (
+    # 🇺🇸 USA (Full coverage including NAIP)
+    LocSpec('New York City, USA', 40.7128, -74.0060,
+            ('naip', 'sentinel', 'landsat', 'worldview'), 'Full (USA)'),
+    
+    # 🇨🇳 China (Sentinel + Landsat + some commercial)
+    LocSpec('Beijing, China', 39.9042, 116.4074,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🇬🇧 Europe (Sentinel + Landsat + some commercial)
+    LocSpec('London, UK', 51.5074, -0.1278,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🇧🇷 South America (Sentinel + Landsat)
+    LocSpec('São Paulo, Brazil', -23.5505, -46.6333,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🇰🇪 Africa (Sentinel + Landsat)
+    LocSpec('Nairobi, Kenya', -1.2921, 36.8219,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🇦🇺 Australia (Sentinel + Landsat)
+    LocSpec('Sydney, Australia', -33.8688, 151.2093,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🇯🇵 Japan (Sentinel + Landsat + some commercial)
+    LocSpec('Tokyo, Japan', 35.6762, 139.6503,
+            ('sentinel', 'landsat'), 'Good (Global datasets)'),
+    
+    # 🏝️ Remote location (Limited coverage)
+    LocSpec('Remote Pacific Island', -15.0, -140.0,
+            ('sentinel', 'landsat'), 'Limited (Ocean area)')
+)
+
+# Stop submitting locations after this many fail in a row (broken auth or
+# network), counting locations that return no images or metadata as failed
+MAX_CONSECUTIVE_FAILURES = 2
+
+# Datasets that indicate high-resolution coverage at a location
+_HIGH_RES = frozenset({'naip', 'worldview', 'geoeye', 'skysat'})
+
+# Query settings shared by every test location; only the point varies
+_query_location = functools.partial(
+    get_san_francisco_tiles_and_images,
+    zoom_level=12,
+    buffer_size=1000,
+    resolution_mode="standard",  # Standard resolution is the most reliable
+    start_date="2023-01-01",
+    end_date="2023-12-31",
+    save_json=False  # Don't save to avoid clutter
+)
 
 def test_global_locations():
     """
     Test various global locations to demonstrate data coverage
     """
     
-    # Test locations across different continents and data coverage zones
-    test_locations = [
-        # 🇺🇸 USA (Full coverage including NAIP)
-        {
-            'name': 'New York City, USA',
-            'lat': 40.7128,
-            'lon': -74.0060,
-            'expected_datasets': ['naip', 'sentinel', 'landsat', 'worldview'],
-            'coverage': 'Full (USA)'
-        },
-        
-        # 🇨🇳 China (Sentinel + Landsat + some commercial)
-        {
-            'name': 'Beijing, China',
-            'lat': 39.9042,
-            'lon': 116.4074,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🇬🇧 Europe (Sentinel + Landsat + some commercial)
-        {
-            'name': 'London, UK',
-            'lat': 51.5074,
-            'lon': -0.1278,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🇧🇷 South America (Sentinel + Landsat)
-        {
-            'name': 'São Paulo, Brazil',
-            'lat': -23.5505,
-            'lon': -46.6333,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🇰🇪 Africa (Sentinel + Landsat)
-        {
-            'name': 'Nairobi, Kenya',
-            'lat': -1.2921,
-            'lon': 36.8219,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🇦🇺 Australia (Sentinel + Landsat)
-        {
-            'name': 'Sydney, Australia',
-            'lat': -33.8688,
-            'lon': 151.2093,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🇯🇵 Japan (Sentinel + Landsat + some commercial)
-        {
-            'name': 'Tokyo, Japan',
-            'lat': 35.6762,
-            'lon': 139.6503,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Good (Global datasets)'
-        },
-        
-        # 🏝️ Remote location (Limited coverage)
-        {
-            'name': 'Remote Pacific Island',
-            'lat': -15.0,
-            'lon': -140.0,
-            'expected_datasets': ['sentinel', 'landsat'],
-            'coverage': 'Limited (Ocean area)'
-        }
-    ]
-    
     print("🌍 GLOBAL LOCATION DATA AVAILABILITY TEST")
     print("=" * 60)
     
     results = {}
     
-    for i, location in enumerate(test_locations, 1):
-        print(f"\n{i}. Testing: {location['name']}")
-        print(f"   Coordinates: {location['lat']}, {location['lon']}")
-        print(f"   Expected coverage: {location['coverage']}")
-        
+    def report(i, location, future):
+        """Print one location's result and record it; return False if it failed."""
+        # Build the location's block and write it out in one go
+        out = io.StringIO()
         try:
-            # Test with standard resolution first (more reliable)
-            result = get_san_francisco_tiles_and_images(
-                lat=location['lat'],
-                lon=location['lon'],
-                zoom_level=12,
-                buffer_size=1000,
-                resolution_mode="standard",
-                start_date="2023-01-01", 
-                end_date="2023-12-31",
-                save_json=False,  # Don't save to avoid clutter
-                output_dir=f"temp_{location['name'].lower().replace(' ', '_').replace(',', '')}"
-            )
-            
-            available_datasets = list(result['image_urls'].keys())
-            results[location['name']] = {
-                'available': available_datasets,
-                'expected': location['expected_datasets'],
-                'coverage': location['coverage'],
-                'coordinates': [location['lat'], location['lon']]
-            }
-            
-            print(f"   ✅ Available datasets: {available_datasets}")
-            print(f"   📊 Dataset count: {len(available_datasets)}")
+            print(f"\n{i}. Testing: {location.name}", file=out)
+            print(f"   Coordinates: {location.lat}, {location.lon}", file=out)
+            print(f"   Expected coverage: {location.coverage}", file=out)
             
-            # Check if high-res datasets are available
-            high_res_available = [d for d in available_datasets if d in ['naip', 'worldview', 'geoeye', 'skysat']]
-            if high_res_available:
-                print(f"   🎯 High-res available: {high_res_available}")
-            else:
-                print(f"   📡 Only global datasets available")
+            try:
+                result = future.result()
+                # The library logs and skips failed Earth Engine requests
+                # rather than raising, so an empty result is the failure signal
+                if not result['image_urls'] and not result['metadata']:
+                    raise RuntimeError("no image URLs or metadata returned, every Earth Engine request failed")
+                
+                available_datasets = list(result['image_urls'].keys())
+                results[location.name] = {
+                    'available': available_datasets,
+                    'expected': list(location.expected_datasets),
+                    'coverage': location.coverage,
+                    'coordinates': [location.lat, location.lon]
+                }
                 
-        except Exception as e:
-            print(f"   ❌ Error: {str(e)[:100]}...")
-            results[location['name']] = {
+                print(f"   ✅ Available datasets: {available_datasets}", file=out)
+                print(f"   📊 Dataset count: {len(available_datasets)}", file=out)
+                
+                # Check if high-res datasets are available
+                high_res_available = [d for d in available_datasets if d in _HIGH_RES]
+                if high_res_available:
+                    print(f"   🎯 High-res available: {high_res_available}", file=out)
+                else:
+                    print(f"   📡 Only global datasets available", file=out)
+                return True
+                    
+            except Exception as e:
+                print(f"   ❌ Error: {str(e)[:100]}...", file=out)
+                results[location.name] = {
+                    'available': [],
+                    'expected': list(location.expected_datasets),
+                    'coverage': location.coverage,
+                    'error': str(e),
+                    'coordinates': [location.lat, location.lon]
+                }
+                return False
+        finally:
+            sys.stdout.write(out.getvalue())
+    
+    # Each location is an independent, I/O-bound Earth Engine query, so they
+    # run in parallel and are reported from this thread as they complete. A
+    # location is only submitted when a worker frees up and the breaker is
+    # still closed, so a broken setup stops early
+    pending = iter(enumerate(TEST_LOCATIONS, 1))
+    future_to_location = {}
+    in_flight = set()
+    workers = min(8, len(TEST_LOCATIONS))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(i, location):
+            future = executor.submit(
+                _query_location,
+                lat=location.lat,
+                lon=location.lon,
+                output_dir=f"temp_{location.slug}"
+            )
+            future_to_location[future] = (i, location)
+            in_flight.add(future)
+        
+        for i, location in itertools.islice(pending, workers):
+            submit(i, location)
+        
+        consecutive_failures = 0
+        tripped = False
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight -= done
+            for future in sorted(done, key=lambda f: future_to_location[f][0]):
+                if report(*future_to_location[future], future):
+                    consecutive_failures = 0
+                else:
+                    consecutive_failures += 1
+                if not tripped and consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    print(f"\n⛔ {consecutive_failures} locations failed in a row, skipping the rest")
+                    tripped = True
+                if not tripped:
+                    for i, location in itertools.islice(pending, 1):
+                        submit(i, location)
+    
+    # Locations never submitted because the breaker tripped are reported as skipped
+    for location in TEST_LOCATIONS:
+        if location.name not in results:
+            results[location.name] = {
                 'available': [],
-                'expected': location['expected_datasets'],
-                'coverage': location['coverage'],
-                'error': str(e),
-                'coordinates': [location['lat'], location['lon']]
+                'expected': list(location.expected_datasets),
+                'coverage': location.coverage,
+                'skipped': True,
+                'coordinates': [location.lat, location.lon]
             }
     
-    # Summary analysis
-    print(f"\n" + "=" * 60)
-    print("📊 GLOBAL DATA COVERAGE SUMMARY")
-    print("=" * 60)
+    # Keep the summary in the original location order
+    results = {location.name: results[location.name] for location in TEST_LOCATIONS}
     
-    coverage_stats = {
-        'Full (USA)': [],
-        'Good (Global datasets)': [],
-        'Limited (Ocean area)': []
-    }
+    # Summary analysis, written out in one go
+    summary = io.StringIO()
+    print(f"\n" + "=" * 60, file=summary)
+    print("📊 GLOBAL DATA COVERAGE SUMMARY", file=summary)
+    print("=" * 60, file=summary)
     
-    for location, data in results.items():
-        coverage_type = data['coverage']
-        dataset_count = len(data['available'])
-        coverage_stats[coverage_type].append({
-            'location': location,
-            'count': dataset_count,
-            'datasets': data['available']
-        })
-    
-    for coverage_type, locations in coverage_stats.items():
-        if locations:
-            print(f"\n{coverage_type}:")
-            for loc_data in locations:
-                print(f"  • {loc_data['location']}: {loc_data['count']} datasets")
+    # One (coverage, location, count, skipped) row per location,
+    # grouped by coverage type; the sort is stable so locations keep their order
+    coverage_rows = [
+        (data['coverage'], location, len(data['available']), data.get('skipped', False))
+        for location, data in results.items()
+    ]
+    
+    for coverage_type, rows in groupby(sorted(coverage_rows, key=itemgetter(0)), key=itemgetter(0)):
+        print(f"\n{coverage_type}:", file=summary)
+        for _, location, count, skipped in rows:
+            if skipped:
+                print(f"  • {location}: skipped", file=summary)
+            else:
+                print(f"  • {location}: {count} datasets", file=summary)
     
     # Best resolution recommendations
-    print(f"\n🎯 RESOLUTION RECOMMENDATIONS BY REGION:")
-    print(f"🇺🇸 USA/Canada: ultra_high_res (0.3-1m) - NAIP + Commercial")
-    print(f"🌍 Major cities globally: high_res (1-10m) - Sentinel + some commercial")  
-    print(f"🌍 Other global locations: standard (10-30m) - Sentinel + Landsat")
-    print(f"🏝️ Remote/ocean areas: standard (10-30m) - Landsat only")
+    print(f"\n🎯 RESOLUTION RECOMMENDATIONS BY REGION:", file=summary)
+    print(f"🇺🇸 USA/Canada: ultra_high_res (0.3-1m) - NAIP + Commercial", file=summary)
+    print(f"🌍 Major cities globally: high_res (1-10m) - Sentinel + some commercial", file=summary)
+    print(f"🌍 Other global locations: standard (10-30m) - Sentinel + Landsat", file=summary)
+    print(f"🏝️ Remote/ocean areas: standard (10-30m) - Landsat only", file=summary)
+    
+    sys.stdout.write(summary.getvalue())
     
     return results
 
+# Recommendations for different types of locations
+_RECOMMENDATIONS = {
+    "🇺🇸 USA": {
+        "best_mode": "ultra_high_res",
+        "resolution": "0.3-1m",
+        "datasets": ["NAIP", "WorldView", "Sentinel-2", "Landsat"],
+        "note": "Full access to highest resolution data"
+    },
+    "🏙️ Major Global Cities": {
+        "best_mode": "high_res", 
+        "resolution": "1-10m",
+        "datasets": ["Sentinel-2", "Some commercial", "Landsat"],
+        "note": "Good coverage for urban analysis"
+    },
+    "🌍 Global Rural/Suburban": {
+        "best_mode": "standard",
+        "resolution": "10-30m", 
+        "datasets": ["Sentinel-2", "Landsat"],
+        "note": "Reliable global coverage"
+    },
+    "🏝️ Remote/Ocean Areas": {
+        "best_mode": "standard",
+        "resolution": "30m",
+        "datasets": ["Landsat"],
+        "note": "Limited but consistent coverage"
+    }
+}
+
+# The recommendations never change, so render them once at import
+_RECOMMENDATIONS_TEXT = "\n".join(
+    [
+        "\n📋 LOCATION-SPECIFIC RECOMMENDATIONS:",
+        "=" * 50
+    ] + [
+        f"\n{region}\n"
+        f"  Best mode: {rec['best_mode']}\n"
+        f"  Resolution: {rec['resolution']}\n"
+        f"  Available datasets: {', '.join(rec['datasets'])}\n"
+        f"  Note: {rec['note']}"
+        for region, rec in _RECOMMENDATIONS.items()
+    ]
+)
+
 def get_location_recommendations():
     """
     Provide specific recommendations for different types of locations
     """
-    recommendations = {
-        "🇺🇸 USA": {
-            "best_mode": "ultra_high_res",
-            "resolution": "0.3-1m",
-            "datasets": ["NAIP", "WorldView", "Sentinel-2", "Landsat"],
-            "note": "Full access to highest resolution data"
-        },
-        "🏙️ Major Global Cities": {
-            "best_mode": "high_res", 
-            "resolution": "1-10m",
-            "datasets": ["Sentinel-2", "Some commercial", "Landsat"],
-            "note": "Good coverage for urban analysis"
-        },
-        "🌍 Global Rural/Suburban": {
-            "best_mode": "standard",
-            "resolution": "10-30m", 
-            "datasets": ["Sentinel-2", "Landsat"],
-            "note": "Reliable global coverage"
-        },
-        "🏝️ Remote/Ocean Areas": {
-            "best_mode": "standard",
-            "resolution": "30m",
-            "datasets": ["Landsat"],
-            "note": "Limited but consistent coverage"
-        }
-    }
-    
-    print("\n📋 LOCATION-SPECIFIC RECOMMENDATIONS:")
-    print("=" * 50)
-    
-    for region, rec in recommendations.items():
-        print(f"\n{region}")
-        print(f"  Best mode: {rec['best_mode']}")
-        print(f"  Resolution: {rec['resolution']}")
-        print(f"  Available datasets: {', '.join(rec['datasets'])}")
-        print(f"  Note: {rec['note']}")
+    print(_RECOMMENDATIONS_TEXT)
 
 if __name__ == "__main__":
+    configure_logging()
+    
+    # Initialize Earth Engine once up front for every call below, and stop
+    # right away if credentials are broken rather than failing per location
+    try:
+        initialize_earth_engine()
+    except ee.EEException as e:
+        print(f"❌ Earth Engine initialization failed: {e}")
+        sys.exit(1)
+    
     print("Testing global location data availability...")
     print("This will test 8 locations across different continents\n")
     
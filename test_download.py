@@ -3,9 +3,22 @@
 Test script for ultra-high resolution image download
 """
 
-from earth_engine_utils import get_san_francisco_tiles_and_images
+from earth_engine_utils import configure_logging, format_table, get_san_francisco_tiles_and_images, initialize_earth_engine, download_images, parse_resolution_meters, convert_image_to_webp
+import functools
 import os
 
+# Ultra-high resolution query settings; only the point varies
+_query_ultra = functools.partial(
+    get_san_francisco_tiles_and_images,
+    zoom_level=20,
+    buffer_size=25,
+    resolution_mode="ultra_high_res",
+    start_date="2023-01-01",
+    end_date="2023-12-31",
+    save_json=True,
+    output_format="jpg"  # JPEG thumbnails move far fewer bytes than PNG
+)
+
 def test_ultra_high_res_download():
     """
     Test ultra-high resolution image download with proper error handling
@@ -13,15 +26,9 @@ def test_ultra_high_res_download():
     print("Testing ultra-high resolution image download...")
     
     try:
-        result = get_san_francisco_tiles_and_images(
+        result = _query_ultra(
             lat=37.7749,
             lon=-122.4194,
-            zoom_level=20,
-            buffer_size=25,
-            resolution_mode="ultra_high_res",
-            start_date="2023-01-01",
-            end_date="2023-12-31",
-            save_json=True,
             output_dir="output/test_ultra_high_res"
         )
         
@@ -36,31 +43,32 @@ def test_ultra_high_res_download():
         # Show metadata for available datasets
         if result['metadata']:
             print(f"\n📊 Dataset Details:")
-            for dataset, meta in result['metadata'].items():
-                resolution = meta.get('resolution', 'Unknown')
-                date = meta.get('date', 'Unknown')
-                cloud_cover = meta.get('cloud_cover', 'N/A')
-                print(f"  • {dataset}: {resolution} resolution, acquired {date}, cloud cover: {cloud_cover}%")
+            print(format_table(
+                ["Dataset", "Resolution", "Acquired", "Cloud cover (%)"],
+                [(dataset, meta.get('resolution', 'Unknown'), meta.get('date', 'Unknown'), meta.get('cloud_cover', 'N/A'))
+                 for dataset, meta in result['metadata'].items()],
+                indent="  "
+            ), end="")
         
-        # Test image downloads
+        # Test image downloads (fetched concurrently over a shared session)
         print(f"\n📥 Downloading images...")
+        filenames = {dataset: f"sf_{dataset}_test_ultra.jpg" for dataset in result['image_urls']}
+        downloaded = download_images(
+            {url: filenames[dataset] for dataset, url in result['image_urls'].items()},
+            "output/test_ultra_high_res"
+        )
+        
         download_count = 0
         for dataset, url in result['image_urls'].items():
-            print(f"  Downloading {dataset}...")
-            filename = f"sf_{dataset}_test_ultra.png"
-            
-            # Import download function
-            from earth_engine_utils import download_image_from_url
-            success = download_image_from_url(url, filename, "output/test_ultra_high_res")
-            
-            if success:
+            filename = filenames[dataset]
+            if downloaded[url]:
                 download_count += 1
-                # Check file size
-                filepath = os.path.join("output/test_ultra_high_res/images", filename)
-                if os.path.exists(filepath):
-                    size_mb = os.path.getsize(filepath) / (1024 * 1024)
+                # Store as WebP when Pillow is available, then check file size
+                filepath = convert_image_to_webp(os.path.join("output/test_ultra_high_res/images", filename))
+                try:
+                    size_mb = os.stat(filepath).st_size / (1024 * 1024)
                     print(f"    ✓ {dataset}: {size_mb:.2f} MB")
-                else:
+                except FileNotFoundError:
                     print(f"    ✗ {dataset}: File not found after download")
             else:
                 print(f"    ✗ {dataset}: Download failed")
@@ -69,6 +77,9 @@ def test_ultra_high_res_download():
         print(f"  • Total datasets available: {len(result['image_urls'])}")
         print(f"  • Successfully downloaded: {download_count}")
         print(f"  • Download success rate: {download_count/len(result['image_urls'])*100:.1f}%")
+        if result['metadata']:
+            best_resolution = min(parse_resolution_meters(meta.get('resolution')) for meta in result['metadata'].values())
+            print(f"  • Best resolution: {best_resolution:.2f}m")
         
         return result
         
@@ -79,6 +90,11 @@ def test_ultra_high_res_download():
         return None
 
 if __name__ == "__main__":
+    configure_logging()
+    
+    # Initialize Earth Engine once up front for every call below
+    initialize_earth_engine()
+    
     result = test_ultra_high_res_download()
     
     if result:
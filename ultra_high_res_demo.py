@@ -4,87 +4,137 @@ Ultra-High Resolution Earth Engine Demo
 Demonstrates sub-meter precision satellite imagery for building-level detail analysis
 """
 
-from earth_engine_utils import get_san_francisco_tiles_and_images
+from earth_engine_utils import configure_logging, format_table, get_tiles_and_images_batch, initialize_earth_engine, parse_resolution_meters, slugify
+from dataclasses import dataclass, field
+from typing import Tuple
+import functools
+import io
 import json
+import sys
 
-def demo_ultra_high_resolution():
-    """
-    Demonstrate ultra-high resolution capabilities with different SF locations
-    """
+@dataclass(frozen=True)
+class LocSpec:
+    """A demo location."""
+    name: str
+    lat: float
+    lon: float
+    description: str
+    slug: str = field(init=False)
     
-    # Different interesting locations in San Francisco for testing
-    locations = [
-        {
-            'name': 'Financial District (Downtown)',
-            'lat': 37.7749,
-            'lon': -122.4194,
-            'description': 'Dense urban area with skyscrapers'
-        },
-        {
-            'name': 'Golden Gate Park',
-            'lat': 37.7694,
-            'lon': -122.4862,
-            'description': 'Large urban park with mixed vegetation'
-        },
-        {
-            'name': 'Lombard Street (Crooked Street)',
-            'lat': 37.8021,
-            'lon': -122.4187,
-            'description': 'Famous winding street with residential buildings'
-        },
+    def __post_init__(self):
+        # Sanitize the name once rather than on every call that needs a path
+        object.__setattr__(self, 'slug', slugify(self.name))
+
+@dataclass(frozen=True)
+class ModeSpec:
+    """A resolution mode configuration to compare."""
+    name: str
+    mode: str
+    buffer: int
+    zoom: int
+    description: str
+
+# Query settings shared by every batch in this demo
+_query_batch = functools.partial(
+    get_tiles_and_images_batch,
+    start_date="2023-01-01",
+    end_date="2023-12-31",
+    save_json=True
+)
+
+# Different interesting locations in San Francisco for testing
+LOCATIONS: Tuple[LocSpec, ...] = (
+    LocSpec('Financial District (Downtown)', 37.7749, -122.4194,
+            'Dense urban area with skyscrapers'),
+    LocSpec('Golden Gate Park', 37.7694, -122.4862,
+            'Large urban park with mixed vegetation'),
+    LocSpec('Lombard Street (Crooked Street)', 37.8021, -122.4187,
+            'Famous winding street with residential buildings'),
+    LocSpec('Pier 39/Fisherman\'s Wharf', 37.8087, -122.4098,
+            'Waterfront area with piers and tourist attractions')
+)
+
+# Resolution modes compared for the same location
+MODES: Tuple[ModeSpec, ...] = (
+    ModeSpec('Standard Resolution', 'standard', 500, 12,
+             'City-level view (30m resolution)'),
+    ModeSpec('High Resolution', 'high_res', 100, 18,
+             'Block-level view (1-10m resolution)'),
+    ModeSpec('Ultra-High Resolution', 'ultra_high_res', 25, 21,
+             'Building-level view (0.3-1m resolution)')
+)
+
+def _location_dicts():
+    """The demo locations as the dictionaries demo_ultra_high_resolution returns."""
+    return [
         {
-            'name': 'Pier 39/Fisherman\'s Wharf',
-            'lat': 37.8087,
-            'lon': -122.4098,
-            'description': 'Waterfront area with piers and tourist attractions'
+            'name': location.name,
+            'lat': location.lat,
+            'lon': location.lon,
+            'description': location.description
         }
+        for location in LOCATIONS
     ]
+
+def demo_ultra_high_resolution():
+    """
+    Demonstrate ultra-high resolution capabilities with different SF locations
+    """
     
     print("=== ULTRA-HIGH RESOLUTION EARTH ENGINE DEMO ===")
     print("Testing sub-meter precision across different San Francisco locations\n")
     
-    for i, location in enumerate(locations, 1):
-        print(f"{i}. {location['name']}")
-        print(f"   Description: {location['description']}")
-        print(f"   Coordinates: {location['lat']}, {location['lon']}")
+    # Query all locations in one batch (a single metadata request to Earth Engine)
+    try:
+        results = _query_batch(
+            [
+                {
+                    'lat': location.lat,
+                    'lon': location.lon,
+                    'zoom_level': 21,                    # Maximum zoom for extreme detail
+                    'buffer_size': 15,                   # Very small area (15m radius)
+                    'resolution_mode': "ultra_high_res", # Ultra-high resolution mode
+                    'output_dir': f"output/{location.slug}"
+                }
+                for location in LOCATIONS
+            ]
+        )
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        print()
+        return _location_dicts()
+    
+    # Build the whole report first and write it out in one go
+    report = io.StringIO()
+    for i, (location, result) in enumerate(zip(LOCATIONS, results), 1):
+        print(f"{i}. {location.name}", file=report)
+        print(f"   Description: {location.description}", file=report)
+        print(f"   Coordinates: {location.lat}, {location.lon}", file=report)
         
-        try:
-            result = get_san_francisco_tiles_and_images(
-                lat=location['lat'],
-                lon=location['lon'],
-                zoom_level=21,                    # Maximum zoom for extreme detail
-                buffer_size=15,                   # Very small area (15m radius)
-                resolution_mode="ultra_high_res", # Ultra-high resolution mode
-                start_date="2023-01-01",
-                end_date="2023-12-31",
-                save_json=True,
-                output_dir=f"output/{location['name'].lower().replace(' ', '_').replace('/', '_')}"
-            )
-            
-            print(f"   ✓ Data collected successfully")
-            print(f"   ✓ JSON saved to: {result.get('saved_to', 'N/A')}")
-            print(f"   ✓ Available datasets: {list(result['image_urls'].keys())}")
-            
-            # Show resolution details
-            if result['metadata']:
-                print(f"   ✓ Resolution details:")
-                for dataset, meta in result['metadata'].items():
-                    resolution = meta.get('resolution', 'Unknown')
-                    date = meta.get('date', 'Unknown')
-                    print(f"     - {dataset}: {resolution} (acquired: {date})")
-            
-            # Show tiles information
-            tiles_count = result['tiles_info']['tile_count']
-            zoom = result['tiles_info']['zoom_level']
-            print(f"   ✓ Tiles: {tiles_count} tiles at zoom level {zoom}")
-            
-            print()
-            
-        except Exception as e:
-            print(f"   ✗ Error: {e}")
-            print()
-    
-    return locations
+        print(f"   ✓ Data collected successfully", file=report)
+        print(f"   ✓ JSON saved to: {result.get('saved_to', 'N/A')}", file=report)
+        print(f"   ✓ Available datasets: {list(result['image_urls'].keys())}", file=report)
+        
+        # Show resolution details
+        if result['metadata']:
+            print(f"   ✓ Resolution details:", file=report)
+            report.write(format_table(
+                ["Dataset", "Resolution", "Acquired"],
+                [(dataset, meta.get('resolution', 'Unknown'), meta.get('date', 'Unknown'))
+                 for dataset, meta in result['metadata'].items()],
+                indent="     "
+            ))
+        
+        # Show tiles information
+        tiles_count = result['tiles_info']['tile_count']
+        zoom = result['tiles_info']['zoom_level']
+        print(f"   ✓ Tiles: {tiles_count} tiles at zoom level {zoom}", file=report)
+        
+        print(file=report)
+    
+    sys.stdout.write(report.getvalue())
+    
+    return _location_dicts()
 
 def compare_resolution_modes():
     """
@@ -96,79 +146,72 @@ def compare_resolution_modes():
     # Use Financial District as test location
     lat, lon = 37.7749, -122.4194
     
-    modes = [
-        {
-            'name': 'Standard Resolution',
-            'mode': 'standard',
-            'buffer': 500,
-            'zoom': 12,
-            'description': 'City-level view (30m resolution)'
-        },
-        {
-            'name': 'High Resolution',
-            'mode': 'high_res',
-            'buffer': 100,
-            'zoom': 18,
-            'description': 'Block-level view (1-10m resolution)'
-        },
-        {
-            'name': 'Ultra-High Resolution',
-            'mode': 'ultra_high_res',
-            'buffer': 25,
-            'zoom': 21,
-            'description': 'Building-level view (0.3-1m resolution)'
-        }
-    ]
+    # Query all three modes for the location in one batch
+    try:
+        batch_results = _query_batch(
+            [
+                {
+                    'lat': lat,
+                    'lon': lon,
+                    'zoom_level': mode_config.zoom,
+                    'buffer_size': mode_config.buffer,
+                    'resolution_mode': mode_config.mode,
+                    'output_dir': f"output/comparison_{mode_config.mode}"
+                }
+                for mode_config in MODES
+            ]
+        )
+    except Exception as e:
+        print(f"  ✗ Error: {e}")
+        print()
+        batch_results = []
     
     results = {}
+    report = io.StringIO()
     
-    for mode_config in modes:
-        print(f"Testing {mode_config['name']}...")
-        print(f"  {mode_config['description']}")
+    for mode_config, result in zip(MODES, batch_results):
+        print(f"Testing {mode_config.name}...", file=report)
+        print(f"  {mode_config.description}", file=report)
         
-        try:
-            result = get_san_francisco_tiles_and_images(
-                lat=lat,
-                lon=lon,
-                zoom_level=mode_config['zoom'],
-                buffer_size=mode_config['buffer'],
-                resolution_mode=mode_config['mode'],
-                start_date="2023-01-01",
-                end_date="2023-12-31",
-                save_json=True,
-                output_dir=f"output/comparison_{mode_config['mode']}"
-            )
-            
-            results[mode_config['mode']] = result
-            
-            print(f"  ✓ Buffer area: {result['location']['buffer_size_meters']}m")
-            print(f"  ✓ Zoom level: {result['configuration']['zoom_level']}")
-            print(f"  ✓ Image size: {2048 if result['configuration']['resolution_mode'] == 'ultra_high_res' else (1024 if result['configuration']['resolution_mode'] == 'high_res' else 512)}px")
-            print(f"  ✓ Datasets: {list(result['image_urls'].keys())}")
-            print(f"  ✓ Tiles: {result['tiles_info']['tile_count']}")
-            print()
-            
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            print()
-    
-    # Summary comparison
-    print("=== SUMMARY COMPARISON ===")
+        results[mode_config.mode] = result
+        
+        print(f"  ✓ Buffer area: {result['location']['buffer_size_meters']}m", file=report)
+        print(f"  ✓ Zoom level: {result['configuration']['zoom_level']}", file=report)
+        print(f"  ✓ Image size: {2048 if result['configuration']['resolution_mode'] == 'ultra_high_res' else (1024 if result['configuration']['resolution_mode'] == 'high_res' else 512)}px", file=report)
+        print(f"  ✓ Datasets: {list(result['image_urls'].keys())}", file=report)
+        print(f"  ✓ Tiles: {result['tiles_info']['tile_count']}", file=report)
+        print(file=report)
+    
+    # Summary comparison, one row per mode
+    print("=== SUMMARY COMPARISON ===", file=report)
     if results:
+        rows = []
         for mode, result in results.items():
-            mode_name = mode.replace('_', '-').title()
-            print(f"\n{mode_name} Mode Summary:")
-            print(f"  Area covered: {result['location']['buffer_size_meters']}m radius")
-            print(f"  Zoom level: {result['configuration']['zoom_level']}")
-            print(f"  Available datasets: {len(result['image_urls'])}")
-            
-            if result['metadata']:
-                best_resolution = min([meta.get('resolution', '999m') for meta in result['metadata'].values()])
-                print(f"  Best resolution: {best_resolution}")
+            best_resolution = min(
+                (parse_resolution_meters(meta.get('resolution')) for meta in result['metadata'].values()),
+                default=float('inf')
+            )
+            rows.append((
+                mode.replace('_', '-').title(),
+                f"{result['location']['buffer_size_meters']}m",
+                result['configuration']['zoom_level'],
+                len(result['image_urls']),
+                f"{best_resolution:.2f}m" if result['metadata'] else "N/A"
+            ))
+        report.write(format_table(
+            ["Mode", "Radius", "Zoom", "Datasets", "Best resolution"], rows, indent="  "
+        ))
+    
+    sys.stdout.write(report.getvalue())
     
     return results
 
 if __name__ == "__main__":
+    configure_logging()
+    
+    # Initialize Earth Engine once up front for every call below
+    initialize_earth_engine()
+    
     print("Starting Ultra-High Resolution Earth Engine Demo...")
     print("This demo showcases sub-meter precision satellite imagery capabilities.\n")
     